@@ -1,8 +1,6 @@
 import logging
 log = logging.getLogger(__name__)
 
-import numpy as np
-
 
 def wrap(length, offset, buffer_size):
     if (offset+length) > buffer_size:
@@ -48,6 +46,10 @@ class AbstractRingBuffer:
     Also, provide implementation of the following methods:
         * _read(self, offset, length)
         * _write(self, offset, data)
+        * _get_empty_array(self, samples)
+
+    Optionally, provide an implementation of `_read_into(self, out, offset,
+    length)` that reads directly into a preallocated array.
     '''
 
     def _offset_to_index(self, offset):
@@ -69,8 +71,15 @@ class AbstractRingBuffer:
         '''
         with self.lock:
             self.latch()
-            return span(self.read_cycle, self.read_index, self.write_cycle,
-                        self.write_index, self.size)
+            return self._pending_latched()
+
+    def _pending_latched(self):
+        '''
+        Number of filled slots waiting to be read, assuming the caller holds
+        the lock and has already latched the write position.
+        '''
+        return span(self.read_cycle, self.read_index, self.write_cycle,
+                    self.write_index, self.size)
 
     def blocks_pending(self):
         '''
@@ -124,12 +133,71 @@ class AbstractRingBuffer:
                 raise ValueError(mesg % (samples, self.pending()))
         except ValueError:
             raise IOError('Read was too slow and unread samples were overwritten')
+        return self._read_samples(samples)
+
+    def read_into(self, out):
+        '''
+        Read samples acquired since last call to read directly into out
 
-        data = [self._read(o, l) for o, l in wrap(samples, self.read_index, self.size)]
-        data = np.concatenate(data, axis=-1)
+        Parameters
+        ----------
+        out : ndarray
+            Array of shape (channels, n) to read into. At most n samples (in
+            complete blocks) are read.
+
+        Returns
+        -------
+        samples : int
+            Number of samples read into out.
+        '''
+        # Check the shape up front. Otherwise, a single channel would be
+        # silently broadcast into every row of out.
+        if out.ndim != 2 or out.shape[0] != self.channels:
+            mesg = 'Array of shape %r cannot hold %d channels'
+            raise ValueError(mesg % (out.shape, self.channels))
+        samples = min(self._poll(), out.shape[-1])
+        samples = int(samples/self.block_size)*self.block_size
+        self._read_samples(samples, out[..., :samples])
+        return samples
+
+    def _poll(self):
+        '''
+        Number of samples in complete blocks waiting to be read
+
+        Used by acquisition loops that query the write position once per tick
+        and only read from the buffer when a block is pending.
+        '''
+        try:
+            return self.blocks_pending()
+        except ValueError:
+            raise IOError('Read was too slow and unread samples were overwritten')
+
+    def _read_samples(self, samples, out=None):
+        '''
+        Read samples starting at the current read index and advance the index.
+        Does not check whether the samples are available for reading.
+
+        If provided, out must be an array of shape (channels, samples) that the
+        data is read directly into.
+        '''
+        if out is None:
+            out = self._get_empty_array(samples)
+        # If the read wraps around the end of the buffer, both segments are
+        # read into the same destination array rather than concatenated.
+        lb = 0
+        for o, l in wrap(samples, self.read_index, self.size):
+            self._read_into(out[..., lb:lb+l], o, l)
+            lb += l
         self.total_samples_read += samples
         self.read_cycle, self.read_index = divmod(self.total_samples_read, self.size)
-        return data
+        return out
+
+    def _read_into(self, out, offset, length):
+        '''
+        Read length samples starting at offset into out. Subclasses can
+        override this to avoid the intermediate array returned by `_read`.
+        '''
+        out[...] = self._read(offset, length)
 
     def write(self, data, offset=None):
         write_cycle, write_index = self._offset_to_index(offset)
@@ -232,11 +232,22 @@ class _DRPcoX(DispatchBaseClass):
         return self._oleobj_.InvokeTypes(10, LCID, 1, (3, 0), ((8, 0), (16388, 0), (3, 0), (3, 0)),Name
             , pBuf, nOS, nWords)
 
+    # For WriteTagV and WriteTagVEX, pythoncom builds the SAFEARRAY of doubles
+    # by iterating over Buf.  Iterating over a Numpy array creates a Numpy
+    # scalar for every sample, which is much slower than iterating over a list
+    # of Python floats, so arrays are converted to a list first.
+    #
+    # This is a hand-edited version of the makepy output.
+
     def WriteTagV(self, Name=defaultNamedNotOptArg, nOS=defaultNamedNotOptArg, Buf=defaultNamedNotOptArg):
+        if hasattr(Buf, 'tolist'):
+            Buf = Buf.tolist()
         return self._oleobj_.InvokeTypes(15, LCID, 1, (3, 0), ((8, 0), (3, 0), (0x2005, 0)),Name
             , nOS, Buf)
 
     def WriteTagVEX(self, Name=defaultNamedNotOptArg, nOS=defaultNamedNotOptArg, DstType=defaultNamedNotOptArg, Buf=defaultNamedNotOptArg):
+        if hasattr(Buf, 'tolist'):
+            Buf = Buf.tolist()
         return self._oleobj_.InvokeTypes(29, LCID, 1, (3, 0), ((8, 0), (3, 0), (8, 0), (0x2005, 0)),Name
             , nOS, DstType, Buf)
 
@@ -4,9 +4,11 @@
 .. moduleauthor:: Brad Buran <bburan@alum.mit.edu
 '''
 import time
+from operator import attrgetter
+
 import numpy as np
 
-from .util import dtype_to_type_str, resolution
+from .util import dtype_to_type_str, resolution, variant_to_ndarray
 from .dsp_error import DSPError
 from .constants import RCX_BUFFER
 from .abstract_ring_buffer import AbstractRingBuffer
@@ -33,6 +35,9 @@ class DSPBuffer(AbstractRingBuffer):
         'n_slots_max', 'n_samples_max', 'size_max', 'channels',
         'block_size']
 
+    # Precompiled getter for all attributes listed above.
+    _get_attributes = attrgetter(*ATTRIBUTES)
+
     def __init__(self, circuit, data_tag, lock, idx_tag=None, size_tag=None,
                  sf_tag=None, cycle_tag=None, dec_tag=None, block_size=1,
                  src_type='float32', dest_type='float32', channels=1,
@@ -49,9 +54,16 @@ class DSPBuffer(AbstractRingBuffer):
         self._zbus = circuit._zbus
         self.data_tag = data_tag
         self.channels = channels
+
+        # The string representation is used in nearly every log message.
+        # Formatting the circuit queries the hardware for its status, so build
+        # it once from the static parts instead.
+        self._str = '{}:{}:{}'.format(circuit.device_name, circuit.name,
+                                      data_tag)
         self.block_size = int(block_size)
         self.latch_trigger = latch_trigger
         self.lock = lock
+        self._zeros = None
 
         self.size_tag = self.find_tag(size_tag, '_n', True, 'size')
         self.idx_tag = self.find_tag(idx_tag, '_i', True, 'index')
@@ -77,6 +89,11 @@ class DSPBuffer(AbstractRingBuffer):
         self.src_type = np.dtype(src_type)
         self.dest_type = np.dtype(dest_type)
 
+        # Shared result for reads that return no data. It has no elements, so
+        # callers cannot modify it, but it stays writeable so that in-place
+        # operations on an empty read (e.g., data *= gain) still work.
+        self._empty = np.empty((self.channels, 0), dtype=self.dest_type)
+
         # Number of samples compressed into a single slot.  The RPvds works
         # with 32 bit words.  If we are compressing our data, calculate the
         # number of samples that are compressed into a single 32 bit word.
@@ -84,6 +101,10 @@ class DSPBuffer(AbstractRingBuffer):
         # single 32 bit (4 byte) word.
         self.compression = int(4/np.nbytes[self.src_type])
 
+        # Converts the value of the index tag (in slots) to samples per
+        # channel. Precomputed since the index tag is polled frequently.
+        self._idx_scale = self.compression / self.channels
+
         # Query buffer for it's size in terms of slots, samples and samples per
         # channel
         self._update_size()
@@ -93,25 +114,20 @@ class DSPBuffer(AbstractRingBuffer):
         self.vex_src_type = dtype_to_type_str(self.src_type)
         self.vex_dest_type = dtype_to_type_str(self.dest_type)
 
-        try:
-            self.resolution = resolution(self.src_type, self.sf)
-        except:
-            # Does the logic change if sf is not 1?  We should never see this
-            # use-case but let's add a check for safety.
-            if self.sf != 1:
-                raise ValueError("FIXME")
-            self.resolution = np.finfo(self.src_type).resolution
+        self.resolution = resolution(self.src_type, self.sf)
 
         # The number of slots in the buffer must be a multiple of channel
         # number, otherwise data will be lost.  This is a requirement of the
         # RPvds circuit, so let's check to make sure this requirement is met as
         # it is a very common mistake to make.
-        if (self.n_slots % self.channels) != 0:
+        if self.n_slots % self.channels:
             mesg = 'Buffer size must be a multiple of the channel number'
             raise DSPError(self, mesg)
 
-        # Spit out debugging information
-        log.debug('Initialized %s', self._get_debug_info())
+        # Spit out debugging information. Collecting the attributes is not
+        # free, so only do so if someone is listening.
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('Initialized %s', self._get_debug_info())
 
     def latch(self):
         if self.latch_trigger is not None:
@@ -194,8 +210,8 @@ class DSPBuffer(AbstractRingBuffer):
 
     def attributes(self, attributes=None):
         if attributes is None:
-            attributes = self.ATTRIBUTES
-        return dict((attr, getattr(self, attr)) for attr in attributes)
+            return dict(zip(self.ATTRIBUTES, self._get_attributes(self)))
+        return {attr: getattr(self, attr) for attr in attributes}
 
     def __getstate__(self):
         '''
@@ -206,6 +222,8 @@ class DSPBuffer(AbstractRingBuffer):
         '''
         state = self.__dict__.copy()
         del state['_iface']
+        # No need to send the cached zeros to the other process.
+        state['_zeros'] = None
         return state
 
     def __setstate__(self, state):
@@ -247,25 +265,29 @@ class DSPBuffer(AbstractRingBuffer):
             number of samples per channel
         '''
         # update size
-        self.n_slots_max = self._iface.GetTagSize(self.data_tag)
+        self.n_slots_max = int(self._iface.GetTagSize(self.data_tag))
         if self.size_tag is not None:
-            self.n_slots = self.circuit.get_tag(self.size_tag)
+            self.n_slots = int(self.circuit.get_tag(self.size_tag))
         else:
             self.n_slots = self.n_slots_max
             log.debug("%s: no size tag available, using GetTagSize", self)
 
-        self.n_samples = round(self.n_slots * self.compression)
-        self.n_samples_max = round(self.n_slots_max * self.compression)
-        self.size = round(self.n_samples / self.channels)
-        self.size_max = round(self.n_samples_max / self.channels)
+        # All of these are integers, so there is no need to go through float
+        # division and rounding.
+        self.n_samples = self.n_slots * self.compression
+        self.n_samples_max = self.n_slots_max * self.compression
+        self.size = self.n_samples // self.channels
+        self.size_max = self.n_samples_max // self.channels
         self.sample_time = self.size / self.fs
         self.max_sample_time = self.size_max / self.fs
 
     def _get_empty_array(self, samples):
+        if samples == 0:
+            return self._empty
         return np.empty((self.channels, samples), dtype=self.dest_type)
 
     def __str__(self):
-        return "{0}:{1}".format(self.circuit, self.data_tag)
+        return self._str
 
     def __repr__(self):
         return "<{0}:{1}:{2}:{3}>".format(self.circuit, self.data_tag,
@@ -284,8 +306,11 @@ class DSPBuffer(AbstractRingBuffer):
         As a workaround, this method zeros out the buffer by writing a stream
         of zeros.
         '''
-        zeros = np.zeros(self.n_samples)
-        self._iface.WriteTagV(self.data_tag, 0, zeros)
+        # The zeros are allocated once in the source type at the maximum size
+        # of the buffer and reused on subsequent calls.
+        if self._zeros is None:
+            self._zeros = np.zeros(self.n_samples_max, dtype=self.src_type)
+        self._iface.WriteTagV(self.data_tag, 0, self._zeros[:self.n_samples])
 
     def _acquire(self, trigger, end_condition, samples=None, trials=1,
                  intertrial_interval=0, poll_interval=0.1, reset_read=True):
@@ -293,30 +318,89 @@ class DSPBuffer(AbstractRingBuffer):
         Convenience function to handle core logic of acquisition.  Use
         `DSPBuffer.acquire` or `DSPBuffer.acquire_samples` instead.
         '''
-        acquired_data = []
+        # When the number of samples is known, the data is read directly into
+        # the final array. Otherwise, each trial is read into a scratch array
+        # that doubles in size as needed and the final array is allocated once
+        # the length of the first trial is known.
+        if samples is not None:
+            acquired_data = np.empty((trials, self.channels, samples),
+                                     dtype=self.dest_type)
+        else:
+            acquired_data = None
+            trial_data = self._get_empty_array(2*self.size_max)
+
+        # The loop below may run at a high rate if poll_interval is small, so
+        # bind everything it uses to locals.
+        debug = log.isEnabledFor(logging.DEBUG)
+        poll = self._poll
+        read_samples = self._read_samples
+        monotonic = time.monotonic
+        sleep = time.sleep
+        fs = self.fs
+
         for i in range(trials):
             if reset_read:
                 self.reset_read(0)
             samples_acquired = 0
-            time.sleep(intertrial_interval)
-            trial_data = []
+            if intertrial_interval:
+                sleep(intertrial_interval)
             self.circuit.trigger(trigger)
+            next_poll = monotonic()
             while True:
-                if end_condition(self, samples_acquired):
+                # Check the end condition before polling the buffer so that
+                # the final poll picks up any data remaining in the buffer.
+                done = end_condition(self, samples_acquired)
+                pending = poll()
+                if pending and samples is None:
+                    lb = samples_acquired
+                    ub = samples_acquired + pending
+                    if ub > trial_data.shape[-1]:
+                        capacity = max(2*trial_data.shape[-1], ub)
+                        grown = self._get_empty_array(capacity)
+                        grown[:, :lb] = trial_data[:, :lb]
+                        trial_data = grown
+                    read_samples(pending, trial_data[:, lb:ub])
+                elif pending:
+                    # Anything acquired beyond the requested number of samples
+                    # is read and discarded.
+                    n = min(pending, max(samples - samples_acquired, 0))
+                    if n:
+                        lb = samples_acquired
+                        read_samples(n, acquired_data[i, :, lb:lb+n])
+                    if pending > n:
+                        read_samples(pending - n)
+                samples_acquired += pending
+                if debug:
+                    log.debug('%s: acquired %d samples', self,
+                              samples_acquired)
+                if done:
                     break
-                new_data = self.read()
-                samples_acquired += new_data.shape[-1]
-                trial_data.append(new_data)
-                log.debug('%s: acquired %d samples', self, samples_acquired)
-                time.sleep(poll_interval)
-            remaining_data = self.read()
-            samples_acquired += remaining_data.shape[-1]
-            trial_data.append(remaining_data)
-            trial_data = np.hstack(trial_data)
-            if samples is not None:
-                trial_data = trial_data[:, :samples]
-            acquired_data.append(trial_data[np.newaxis])
-        return np.vstack(acquired_data)
+
+                # Poll at a fixed rate so that the time spent reading counts
+                # towards the poll interval. If we know how many samples are
+                # left, don't wait longer than it takes to acquire them.
+                now = monotonic()
+                next_poll = max(next_poll + poll_interval, now)
+                if samples is not None:
+                    remaining = (samples - samples_acquired) / fs
+                    next_poll = min(next_poll, now + remaining)
+                if next_poll > now:
+                    sleep(next_poll - now)
+
+            if samples is None:
+                if acquired_data is None:
+                    acquired_data = np.empty(
+                        (trials, self.channels, samples_acquired),
+                        dtype=self.dest_type)
+                elif acquired_data.shape[-1] != samples_acquired:
+                    raise ValueError('Number of samples acquired varied '
+                                     'across trials')
+                acquired_data[i] = trial_data[:, :samples_acquired]
+
+        if acquired_data is None:
+            acquired_data = np.empty((0, self.channels, 0),
+                                     dtype=self.dest_type)
+        return acquired_data
 
     def acquire(self, trigger, handshake_tag, end_condition=None, trials=1,
                 intertrial_interval=0, poll_interval=0.1, reset_read=True):
@@ -413,10 +497,12 @@ class ReadableDSPBuffer(DSPBuffer):
         self.read_index = 0
         self.read_cycle = 0
         self.total_samples_read = 0
+        self._read_into = self._make_read_into()
 
     def _get_write_index(self):
-        index = int(self.circuit.get_tag(self.idx_tag))
-        return index * self.compression / self.channels
+        # The index tag was validated when the buffer was initialized, so go
+        # straight to the driver rather than through DSPCircuit.get_tag.
+        return int(self._iface.GetTagVal(self.idx_tag)) * self._idx_scale
 
     write_index = property(_get_write_index)
 
@@ -428,18 +514,60 @@ class ReadableDSPBuffer(DSPBuffer):
     write_cycle = property(_get_write_cycle)
 
     def _read(self, offset, length):
-        log.debug("%s: read offset %d, read size %d", self, offset, length)
-        if length == 0:
-            data = np.array([], dtype=self.dest_type)
-            return data.reshape((self.channels, -1))
+        out = self._get_empty_array(length)
+        self._read_into(out, offset, length)
+        return out
+
+    def _make_read_into(self):
+        '''
+        Returns an implementation of `_read_into` specialized for this buffer
+
+        The tag, data types, channel count and scaling factor are fixed for the
+        lifetime of the buffer, so they are bound once here rather than looked
+        up on every read.
+        '''
+        read_tag = self._iface.ReadTagVEX
+        data_tag = self.data_tag
+        vex_args = self.vex_src_type, self.vex_dest_type, self.channels
+        sf = self.sf
+        name = str(self)
 
         # At this point, we have already done the necessary computation of
         # offset and read size so all we have to do is pass those values
-        # directly to the ReadTagVEX function.
-        data = self._iface.ReadTagVEX(
-            self.data_tag, offset, length,
-            self.vex_src_type, self.vex_dest_type, self.channels)
-        return np.divide(data, self.sf).astype(self.dest_type)
+        # directly to the ReadTagVEX function. ReadTagVEX has already
+        # deinterleaved the channels, so convert the result straight into the
+        # destination array and scale it in place so that no intermediate
+        # float64 array is created. Divide rather than multiply by 1/sf so the
+        # result is rounded (and truncated for integer types) exactly as
+        # np.divide(data, sf).astype(dest_type) would.
+        if self.sf == 1:
+            def read_into(out, offset, length):
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("%s: read offset %d, read size %d", name, offset,
+                              length)
+                if length:
+                    data = read_tag(data_tag, offset, length, *vex_args)
+                    variant_to_ndarray(data, None, out)
+        else:
+            def read_into(out, offset, length):
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug("%s: read offset %d, read size %d", name, offset,
+                              length)
+                if length:
+                    data = read_tag(data_tag, offset, length, *vex_args)
+                    variant_to_ndarray(data, None, out)
+                    np.divide(out, sf, out=out, casting='unsafe')
+        return read_into
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        # Bound to the COM object, so it must be recreated in the new process.
+        del state['_read_into']
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._read_into = self._make_read_into()
 
 
 class WriteableDSPBuffer(DSPBuffer):
@@ -449,11 +577,11 @@ class WriteableDSPBuffer(DSPBuffer):
         self.write_index = 0
         self.write_cycle = 0
         self.total_samples_written = 0
+        self._conversion_logged = False
 
     def _get_read_index(self):
         # This returns the current sample that's been read
-        index = int(self.circuit.get_tag(self.idx_tag))
-        return index * self.compression / self.channels
+        return int(self._iface.GetTagVal(self.idx_tag)) * self._idx_scale
 
     read_index = property(_get_read_index)
 
@@ -465,15 +593,60 @@ class WriteableDSPBuffer(DSPBuffer):
     read_cycle = property(_get_read_cycle)
 
     def _write(self, offset, data):
-        log.debug("%s: write %d samples at %d", self, len(data), offset)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("%s: write %d samples at %d", self, len(data), offset)
         return self._iface.WriteTagV(self.data_tag, offset, data)
 
+    def _as_src_type(self, data):
+        '''
+        Convert data to a C-contiguous array of the buffer's source type
+
+        Doing this once up front makes the copy explicit rather than leaving it
+        to the ActiveX marshalling of each segment. The first conversion is
+        logged so that callers can switch to generating data in the source
+        type.
+        '''
+        if getattr(data, 'dtype', None) == self.src_type \
+                and data.flags.c_contiguous:
+            return data
+        if not self._conversion_logged:
+            log.info('%s: converting data to %s before writing', self,
+                     self.src_type)
+            self._conversion_logged = True
+        return np.ascontiguousarray(data, dtype=self.src_type)
+
+    def write(self, data, offset=None):
+        # Converting to a compressed source type would silently truncate the
+        # data, so only float32 buffers are converted.
+        if self.vex_src_type == 'F32':
+            data = self._as_src_type(data)
+        return super().write(data, offset)
+
+    def write_from(self, src, offset=None):
+        '''
+        Write data to the buffer without any NumPy-level conversion
+
+        Behaves the same as `write`, but src must be a C-contiguous array that
+        is already in the buffer's source type so that it can be passed
+        directly to the ActiveX driver.
+        '''
+        if src.dtype != self.src_type or not src.flags.c_contiguous:
+            mesg = 'Data must be a C-contiguous array of type %s'
+            raise ValueError(mesg % self.src_type)
+        # Bypass `write` since src has already been checked.
+        return super().write(src, offset)
+
     def set(self, data):
         '''
         Assumes data is written starting at the first index of the buffer. Use
         for epoch-based playout.
         '''
-        data = np.asarray(data)
+        # Check before touching the hardware (i.e., setting the size). As in
+        # `write`, converting to a compressed source type would silently
+        # truncate the data.
+        if self.vex_src_type != 'F32':
+            raise NotImplementedError
+        data = self._as_src_type(data)
         size = data.shape[-1]
         if size > self.size_max:
             mesg = "Cannot write %d samples to buffer" % size
@@ -487,8 +660,6 @@ class WriteableDSPBuffer(DSPBuffer):
         if size == 0:
             return
 
-        if self.vex_src_type != 'F32':
-            raise NotImplementedError
         if not self._iface.WriteTagV(self.data_tag, 0, data):
             raise DSPError(self, "write failed")
         log.debug("%s: set buffer with %d samples", self, size)
@@ -1,8 +1,17 @@
 class DSPError(Exception):
 
     def __init__(self, device, mesg):
+        # The message is formatted lazily in __str__ since formatting the
+        # device may require querying the hardware for its status.
+        super().__init__(mesg)
         self.device = device
         self.mesg = mesg
 
     def __str__(self):
         return '{}: {}'.format(self.device, self.mesg)
+
+    def __reduce__(self):
+        # The device is usually a circuit or buffer that cannot be pickled
+        # (and would reconnect to the hardware if it were unpickled), so send
+        # its string representation instead (e.g., between processes).
+        return DSPError, (str(self.device), self.mesg)
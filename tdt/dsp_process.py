@@ -95,7 +95,7 @@ def monitor(circuit_info, poll_period, pipe):
             condition = info['condition']
 
             hw_buffer = circuit.get_buffer(buffer_name, mode, *args, **kwargs)
-            cache = shmem_as_ndarray(shmem).reshape((hw_buffer.channels, -1))
+            cache = shmem_as_ndarray(shmem, shape=(hw_buffer.channels, -1))
 
             # The mode refers to the hardware buffer itself.  If we want to
             # read from the hardware buffer, then we need to write the data to
@@ -213,7 +213,7 @@ class DSPProcess(mp.Process):
 
         buffer = circuit.get_buffer(buffer_name, mode, *args, **kwargs)
         cache_size = int(buffer.fs*self.cache_duration)*buffer.channels
-        mem_type = NP_TO_CTYPES[buffer.dest_type]
+        mem_type = NP_TO_CTYPES[buffer.dest_type.str]
 
         # Allocate the cache memory and create shared values used for
         # inter-process communication
@@ -237,7 +237,7 @@ class DSPProcess(mp.Process):
 
         # Initialize the shared memory space for storing data acquired from the
         # DSP hardware
-        cache = shmem_as_ndarray(shmem).reshape((buffer.channels, -1))
+        cache = shmem_as_ndarray(shmem, shape=(buffer.channels, -1))
         args = cache, iwrite, iread, ioffset, condition, circuit
         if mode == 'r':
             sh_buffer = ReadableSharedRingBuffer(*args)
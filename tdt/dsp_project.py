@@ -63,6 +63,52 @@ class DSPProject(object):
         for circuit in self._circuits.values():
             circuit.stop()
 
+    def poll_buffers(self, buffers):
+        '''
+        Read all complete blocks acquired since the last read from several
+        buffers
+
+        Buffers that share a circuit and latch trigger are latched once, so
+        their write positions are captured with a single trigger rather than
+        one per buffer. This also ensures that the positions are captured at
+        the same point in time.
+
+        Parameters
+        ----------
+        buffers : list of ReadableDSPBuffer
+            Buffers to read from. Each buffer may only appear once.
+
+        Returns
+        -------
+        data : list of ndarray
+            Data read from each buffer (in the same order as buffers).
+        '''
+        # Reading a buffer twice with the same pending count would read past
+        # the write index.
+        if len(set(map(id, buffers))) != len(buffers):
+            raise ValueError('Each buffer may only be polled once')
+
+        groups = {}
+        for buffer in buffers:
+            key = id(buffer.circuit), buffer.latch_trigger
+            groups.setdefault(key, []).append(buffer)
+
+        pending = {}
+        for group in groups.values():
+            with group[0].lock:
+                group[0].latch()
+                for buffer in group:
+                    try:
+                        samples = buffer._pending_latched()
+                    except ValueError:
+                        raise IOError('Read was too slow and unread samples '
+                                      'were overwritten')
+                    block_size = buffer.block_size
+                    pending[id(buffer)] = \
+                        int(samples/block_size)*block_size
+
+        return [b._read_samples(pending[id(b)]) for b in buffers]
+
     def trigger(self, trigger, mode='pulse'):
         '''
         Fire a zBUS trigger
@@ -74,6 +74,10 @@ class SharedRingBuffer(AbstractRingBuffer):
         with self._condition:
             return super(SharedRingBuffer, self).read(samples)
 
+    def read_into(self, out):
+        with self._condition:
+            return super(SharedRingBuffer, self).read_into(out)
+
     def write(self, data, timeout=None):
         with self._condition:
             result = super(SharedRingBuffer, self).write(data)
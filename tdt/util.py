@@ -13,6 +13,8 @@ of the server via a tuple (hostname, port)::
 .. autofunction:: connect_zbus
 .. autofunction:: connect_rpcox
 .. autofunction:: connect_pa5
+.. autofunction:: decimate
+.. autofunction:: variant_to_ndarray
 
 .. note::
 
@@ -24,7 +26,9 @@ of the server via a tuple (hostname, port)::
 import os
 import numpy as np
 import ctypes
+import weakref
 import winreg
+from functools import lru_cache
 
 # Initialize
 from .dsp_error import DSPError
@@ -76,6 +80,15 @@ def connect_pa5(interface=None, device_id=1, address=None):
         raise ImportError('ActiveX drivers from TDT not installed')
 
 
+def _init_zbus_triggers(driver):
+    # zBUS trigger is set to high for record mode, so ensure that both triggers
+    # are initialized to low. The ZBUSx driver has no call that sets both
+    # triggers at once.
+    driver.zBusTrigA(0, 2, 10)
+    driver.zBusTrigB(0, 2, 10)
+    log.debug("Set zBusTrigA and zBusTrigB to low")
+
+
 def connect_zbus(interface=None, address=None):
     '''
     Connect to the zBUS interface and set the zBUS A and zBUS B triggers to low
@@ -124,13 +137,7 @@ def connect_zbus(interface=None, address=None):
         driver.ConnectZBUS(interface)
         log.debug("Connected to zBUS (probably)")
 
-        # zBUS trigger is set to high for record mode, so ensure that both
-        # triggers are initialized to low.
-        driver.zBusTrigA(0, 2, 10)
-        driver.zBusTrigB(0, 2, 10)
-        log.debug("Set zBusTrigA to low")
-        log.debug("Set zBusTrigB to low")
-
+        _init_zbus_triggers(driver)
         ZBUS_CONNECTIONS[interface, address] = driver
         return driver
     except pywintypes.com_error:
@@ -170,38 +177,77 @@ def connect_rpcox(name, interface=None, device_id=1, address=None):
         driver = actxobjects.RPcoX()
     else:
         driver = dsp_server.RPcoXNET(address)
-    if not getattr(driver, 'Connect%s' % name)(interface, device_id):
+    connect = getattr(driver, 'Connect' + name, None)
+    if connect is None:
+        raise ValueError("Unsupported device %r" % name)
+    if not connect(interface, device_id):
         raise DSPError(name, "Connection failed")
     log.debug("Connected to %s", name)
     return driver
 
 
+# Directory containing the circuits that ship with TDTPy.
+_COMPONENTS_DIR = os.path.join(os.path.dirname(__file__), 'components')
+
+
+def _list_components():
+    try:
+        filenames = os.listdir(_COMPONENTS_DIR)
+    except OSError:
+        return {}
+    return {os.path.normcase(f): os.path.join(_COMPONENTS_DIR, f)
+            for f in filenames if f.lower().endswith('.rcx')}
+
+
+# Circuits that ship with TDTPy, keyed by normalized filename (i.e., lowercase
+# on Windows, where filenames are case-insensitive). These take precedence over
+# circuits in the current working directory.
+_COMPONENTS = _list_components()
+
+
 def get_cof_path(circuit_name):
     '''
     Given relative path, returns absolute path to circuit file.  The *.rcx
     extension may be omitted.
     '''
-    search_dirs = [os.path.join(os.path.dirname(__file__), 'components'),
-                   os.getcwd(), ]
-    log.debug("Searching %r", search_dirs)
-
-    success = False
-    if not circuit_name.endswith('.rcx'):
+    if not circuit_name.lower().endswith('.rcx'):
         circuit_name += '.rcx'
+    circuit_path = _COMPONENTS.get(os.path.normcase(circuit_name))
+    if circuit_path is not None:
+        return circuit_path
 
-    log.debug("Attempting to locate circuit %s", circuit_name)
-    for dir in search_dirs:
-        circuit_path = os.path.join(dir, circuit_name)
+    # Not cached since the file may be renamed or removed between loads.
+    circuit_path = os.path.join(os.getcwd(), circuit_name)
+    if log.isEnabledFor(logging.DEBUG):
         log.debug('Checking %s', circuit_path)
-        if os.path.exists(circuit_path):
-            success = True
-            break
-
-    if not success:
-        raise IOError("Could not find circuit %s" % circuit_name)
+    if not os.path.exists(circuit_path):
+        raise FileNotFoundError("Could not find circuit %s" % circuit_name)
     return circuit_path
 
 
+def _asdtype(data_type):
+    # Skip the np.dtype constructor when we already have a dtype. This must be
+    # isinstance since newer versions of Numpy use a subclass for each dtype.
+    if isinstance(data_type, np.dtype):
+        return data_type
+    return np.dtype(data_type)
+
+
+# TDT type string for each (dtype.kind, dtype.itemsize) supported by the
+# ReadTagVEX and WriteTagVEX functions. The number in the type string is the
+# size in bits.
+_TDT_TYPE_STR = {
+    ('i', 1): 'I8',
+    ('u', 1): 'I8',
+    ('i', 2): 'I16',
+    ('u', 2): 'I16',
+    ('i', 4): 'I32',
+    ('u', 4): 'I32',
+    ('f', 4): 'F32',
+}
+
+
+@lru_cache(maxsize=64)
 def dtype_to_type_str(data_type):
     '''
     Convert Numpy dtype to the type string required by TDT's libraries
@@ -226,21 +272,12 @@ def dtype_to_type_str(data_type):
         ...
     ValueError: Unsupported Numpy dtype
     '''
-    if np.issubdtype(data_type, np.integer):
-        type_code = 'I'
-    elif np.issubdtype(data_type, np.floating):
-        type_code = 'F'
-    else:
+    data_type = _asdtype(data_type)
+    try:
+        type_str = _TDT_TYPE_STR[data_type.kind, data_type.itemsize]
+    except KeyError:
         raise ValueError("Unsupported Numpy dtype")
-
-    # Since dtype.itemsize is the number of bytes, and the number in the TDT
-    # type string reflects bit number, we can translate it by multiplying by 8.
-    # Likewise, dtype.char is 'i' for integer and 'f' for floating point
-    # datatypes.
-    type_str = "{0}{1}".format(type_code, data_type.itemsize*8)
     log.debug("%r TDT type string is %s", data_type, type_str)
-    if type_str not in ['F32', 'I32', 'I16', 'I8']:
-        raise ValueError("Unsupported dtype")
     return type_str
 
 
@@ -256,18 +293,38 @@ def best_sf(data_type, range):
         Expected data range.  If scalar, assumes the value falls in the range
         (-range, range)
     '''
-    data_type = np.dtype(data_type)
+    # Normalize the range so that it is hashable. Flatten any sequence
+    # (including nested sequences and arrays) to a flat tuple of numbers, and
+    # convert scalars (including 0-d arrays) to float.
+    if np.ndim(range):
+        range = tuple(np.ravel(range).tolist())
+    else:
+        range = float(range)
+    return _best_sf(data_type, range)
+
+
+@lru_cache(maxsize=64)
+def _best_sf(data_type, range):
+    data_type = _asdtype(data_type)
     try:
+        max_val = max(abs(r) for r in range)
+    except TypeError:
+        # Scalar range
+        max_val = abs(range)
+    if data_type.kind in 'iu':
         info = np.iinfo(data_type)
-    except:
+    else:
         info = np.finfo(data_type)
-    return info.max/np.abs(range).max()
+    return info.max/max_val
 
 
 def resolution(data_type, scaling_factor):
     '''
     Computes resolution for data type given scaling factor
 
+    For floating-point data types, this is the decimal resolution of the type
+    (see `np.finfo`) divided by the scaling factor.
+
     Parameters
     ----------
     data_type : dtype
@@ -275,11 +332,82 @@ def resolution(data_type, scaling_factor):
     scaling_factor : float
         Scaling factor applied to data
     '''
-    data_type = np.dtype(data_type)
-    if np.issubdtype(data_type, np.integer):
-        return 1/float(scaling_factor)
-    else:
-        raise ValueError("Float data types not supported")
+    # Convert to float so that the scaling factor is hashable (e.g., if it is a
+    # 0-d array).
+    return _resolution(data_type, float(scaling_factor))
+
+
+@lru_cache(maxsize=64)
+def _resolution(data_type, scaling_factor):
+    data_type = _asdtype(data_type)
+    if data_type.kind in 'iu':
+        return 1/scaling_factor
+    elif data_type.kind == 'f':
+        return float(np.finfo(data_type).resolution)/scaling_factor
+    raise ValueError("Unsupported Numpy dtype")
+
+
+def decimate(x, factor):
+    '''
+    Decimate data along the last axis by keeping every factor-th sample
+
+    This matches the decimation performed by the circuit when a buffer has a
+    decimation tag, which is useful for comparing data written to the hardware
+    with the decimated data read back. Incomplete groups of samples at the end
+    are dropped.
+
+    >>> decimate(np.arange(10), 4)
+    array([0, 4])
+
+    Parameters
+    ----------
+    x : array-like
+        Data to decimate
+    factor : int
+        Decimation factor
+
+    Returns
+    -------
+    y : ndarray
+        Contiguous array of decimated data
+    '''
+    x = np.asarray(x)
+    n = x.shape[-1] // factor
+    # Reshaping to (..., n, factor) is free for contiguous data, so the only
+    # pass over the data is copying the first sample of each group.
+    y = x[..., :n*factor].reshape(x.shape[:-1] + (n, factor))[..., 0]
+    return np.ascontiguousarray(y)
+
+
+def variant_to_ndarray(v, dtype, out=None):
+    '''
+    Convert the data returned by an ActiveX call (e.g., ReadTagVEX) to an array
+
+    pywin32 unpacks the SAFEARRAY returned by the driver into a (nested) tuple
+    of Python numbers and does not expose the underlying buffer, so the data
+    cannot be wrapped with `np.frombuffer`.  The fastest remaining path is to
+    let numpy convert the sequence in a single C-level pass, never iterating
+    over it in Python.
+
+    Parameters
+    ----------
+    v : sequence
+        Data returned by the driver
+    dtype : dtype
+        Data type of the returned array.  Ignored if out is provided.
+    out : {None, ndarray}
+        If provided, the data is converted directly into this array, which must
+        have the same shape as the data.
+
+    Returns
+    -------
+    out : ndarray
+    '''
+    if out is None:
+        return np.array(v, dtype=dtype)
+    out[...] = v
+    return out
+
 
 CTYPES_TO_NP = {
     ctypes.c_char: np.int8,
@@ -295,31 +423,63 @@ CTYPES_TO_NP = {
     ctypes.c_float: np.float32,
     ctypes.c_double: np.float64,
 }
-# Reverse lookup
-NP_TO_CTYPES = dict((np.dtype(v), k) for k, v in CTYPES_TO_NP.items())
+# Same mapping, but with the dtype objects constructed up front
+CTYPES_TO_NP_DTYPE = {k: np.dtype(v) for k, v in CTYPES_TO_NP.items()}
+
+# Reverse lookup keyed by dtype.str (e.g., '<i4'), which is a cheap string to
+# hash and, unlike dtype.num, is the same for all aliases of a type (e.g., intc
+# and int32 on Windows).
+NP_TO_CTYPES = {np.dtype(v).str: k for k, v in CTYPES_TO_NP.items()}
 
 
-def shmem_as_ndarray(raw_array):
+# Views returned by shmem_as_ndarray.  Each view keeps its raw_array alive, so
+# the id in the key cannot be reused while the entry exists.
+_SHMEM_VIEW_CACHE = weakref.WeakValueDictionary()
+
+# Alignment (in bytes) of the widest SIMD registers used by Numpy (AVX2).
+_SIMD_ALIGNMENT = 32
+
+
+def shmem_as_ndarray(raw_array, readonly=False, shape=None):
     '''
     Create a ndarray wrapper around shared memory space
+
+    Parameters
+    ----------
+    raw_array : multiprocessing.RawArray
+        Shared memory to wrap
+    readonly : bool
+        If True, the returned array cannot be written to.  Useful for consumers
+        (e.g., plotting or saving) that should never modify the shared data.
+    shape : {None, tuple}
+        If provided, the array is reshaped (e.g., to (channels, -1)).
+
+    Repeated calls for the same raw_array return the same ndarray for as long
+    as it is alive, so do not change its shape or flags in place (use
+    `reshape` to get a new view instead).
     '''
-    address = raw_array._wrapper.get_address()
-    size = raw_array._wrapper.get_size()
-    dtype = CTYPES_TO_NP[raw_array._type_]
-
-    class NDArrayView(object):
-        pass
-
-    d = NDArrayView()
-    d.__array_interface__ = {
-        'data': (address, False),
-        'typestr': np.dtype('uint8').str,
-        'descr': np.dtype('uint8').descr,
-        'shape': (size,),
-        'strides': None,
-        'version': 3,
-    }
-    return np.asarray(d).view(dtype=dtype)
+    key = id(raw_array), readonly, shape
+    arr = _SHMEM_VIEW_CACHE.get(key)
+    if arr is not None:
+        return arr
+
+    dtype = CTYPES_TO_NP_DTYPE[raw_array._type_]
+    if log.isEnabledFor(logging.DEBUG):
+        # Numpy's vectorized loops work best on data aligned to 32 bytes.
+        address = ctypes.addressof(raw_array)
+        if address % _SIMD_ALIGNMENT:
+            log.debug("Shared memory at %#x is not %d-byte aligned", address,
+                      _SIMD_ALIGNMENT)
+    # The ctypes array exports the buffer protocol, so numpy can view it
+    # directly.  The view keeps a reference to raw_array, so the memory stays
+    # valid for as long as the ndarray exists.
+    arr = np.frombuffer(raw_array, dtype=dtype)
+    if shape is not None:
+        arr = arr.reshape(shape)
+    if readonly:
+        arr.flags.writeable = False
+    _SHMEM_VIEW_CACHE[key] = arr
+    return arr
 
 
 if __name__ == '__main__':
@@ -1,6 +1,13 @@
+import ctypes
+import multiprocessing as mp
+import threading
+
+import numpy as np
 import pytest
 
 from tdt.abstract_ring_buffer import span
+from tdt.shared_ring_buffer import ReadableSharedRingBuffer
+from tdt.util import shmem_as_ndarray
 
 
 def test_span():
@@ -20,3 +27,86 @@ def test_span():
         span(1, 0, 2, 1, 10)
     with pytest.raises(ValueError, match='Start sample higher than end sample'):
         span(3, 0, 2, 1, 10)
+
+
+class FakeSharedRingBuffer(ReadableSharedRingBuffer):
+    # The shared ring buffers do not track the write cycle or provide the
+    # lock/latch used by `pending`, so supply minimal versions here. The write
+    # position is advanced by the test to simulate the acquisition process.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.RLock()
+        self.read_cycle = 0
+        self.write_cycle = 0
+        self.total_samples_read = 0
+
+    def latch(self):
+        pass
+
+    def simulate_write(self, data):
+        # Simulate the other process writing data into the shared memory.
+        samples = data.shape[-1]
+        offset = self.write_cycle * self.size + self.write_index
+        for i, s in enumerate(range(offset, offset + samples)):
+            self._cache[:, s % self.size] = data[:, i]
+        self.write_cycle, self.write_index = \
+            divmod(offset + samples, self.size)
+
+
+@pytest.fixture
+def shared_buffer():
+    raw_array = mp.RawArray(ctypes.c_float, 20)
+    cache = shmem_as_ndarray(raw_array, shape=(2, -1))
+    values = [mp.Value(ctypes.c_uint), mp.Value(ctypes.c_uint),
+              mp.Value(ctypes.c_int)]
+    return FakeSharedRingBuffer(cache, *values, mp.Condition(), None)
+
+
+def test_shared_read_into(shared_buffer):
+    data = np.arange(2 * 25, dtype=np.float32).reshape((2, 25))
+    out = np.full((2, 8), -1, dtype=np.float32)
+
+    shared_buffer.simulate_write(data[:, :7])
+    assert shared_buffer.read_into(out) == 7
+    np.testing.assert_array_equal(out[:, :7], data[:, :7])
+    assert out[0, 7] == -1
+
+    # This read wraps around the end of the buffer and is limited to the
+    # size of out.
+    shared_buffer.simulate_write(data[:, 7:17])
+    assert shared_buffer.read_into(out) == 8
+    np.testing.assert_array_equal(out, data[:, 7:15])
+    assert shared_buffer.total_samples_read == 15
+    assert (shared_buffer.read_cycle, shared_buffer.read_index) == (1, 5)
+
+    # Only the remaining two samples are pending.
+    assert shared_buffer.read_into(out) == 2
+    np.testing.assert_array_equal(out[:, :2], data[:, 15:17])
+    assert shared_buffer.read_into(out) == 0
+
+
+def test_shared_read_samples(shared_buffer):
+    data = np.arange(2 * 25, dtype=np.float32).reshape((2, 25))
+    shared_buffer.simulate_write(data[:, :8])
+    np.testing.assert_array_equal(shared_buffer._read_samples(8), data[:, :8])
+
+    # Wrapped read into a preallocated array
+    shared_buffer.simulate_write(data[:, 8:14])
+    out = np.empty((2, 6), dtype=np.float32)
+    assert shared_buffer._read_samples(6, out) is out
+    np.testing.assert_array_equal(out, data[:, 8:14])
+    assert (shared_buffer.read_cycle, shared_buffer.read_index) == (1, 4)
+
+    # Read all pending samples through the locked read()
+    shared_buffer.simulate_write(data[:, 14:20])
+    np.testing.assert_array_equal(shared_buffer.read(), data[:, 14:20])
+
+
+def test_shared_read_into_shape(shared_buffer):
+    shared_buffer.simulate_write(np.ones((2, 4), dtype=np.float32))
+    for shape in ((1, 4), (3, 4), (4,), (1, 2, 4)):
+        with pytest.raises(ValueError, match='cannot hold 2 channels'):
+            shared_buffer.read_into(np.empty(shape, dtype=np.float32))
+    # Nothing was read by the failed attempts.
+    assert shared_buffer.total_samples_read == 0
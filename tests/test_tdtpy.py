@@ -4,6 +4,7 @@ import time
 import numpy as np
 
 from tdt import DSPProject
+from tdt.util import decimate
 
 
 BASE_FS = 97656.25
@@ -54,7 +55,7 @@ def test_buffer_fs(ao1, ai1):
 
 def test_circuit_write_read(project, ao1, ai1):
     n = round(ao1.fs)
-    write_samples = np.random.uniform(size=n)
+    write_samples = np.random.uniform(size=n).astype(np.float32)
     ao1.write(write_samples)
     project.trigger('A', 'high')
     time.sleep(1)
@@ -77,7 +78,7 @@ def test_circuit_write_read_dec(project, circuit, ao1, dec_factor):
 
     n = round(ao1.fs / 10)
     t = np.arange(n) / ao1.fs
-    write_samples = np.sin(2 * np.pi * 50 * t)
+    write_samples = np.sin(2 * np.pi * 50 * t).astype(np.float32)
     ao1.write(write_samples)
 
     project.trigger('A', 'high')
@@ -88,7 +89,7 @@ def test_circuit_write_read_dec(project, circuit, ao1, dec_factor):
 
     n_dec = int(n / dec_factor)
     read_samples_dec = np.concatenate(read_samples_dec, axis=-1)[0, :n_dec]
-    write_samples_dec = write_samples[::dec_factor][:n_dec]
+    write_samples_dec = decimate(write_samples, dec_factor)
     np.testing.assert_allclose(write_samples_dec, read_samples_dec)
 
 
@@ -97,11 +98,11 @@ def test_circuit_write_too_slow(project, ao1):
     # samples generated by the output buffer run into an area of the ring
     # buffer that has not received new data yet.
     n = round(ao1.fs)
-    ao1.write(np.random.uniform(size=n))
+    ao1.write(np.random.uniform(size=n).astype(np.float32))
     project.trigger('A', 'high')
     time.sleep(1)
     with pytest.raises(IOError, match='Write was too slow and old samples were regenerated'):
-        ao1.write(np.random.uniform(size=n))
+        ao1.write(np.random.uniform(size=n).astype(np.float32))
 
 
 def test_circuit_missing_initial_write(project, ao1):
@@ -112,7 +113,7 @@ def test_circuit_missing_initial_write(project, ao1):
     n = round(ao1.fs)
     project.trigger('A', 'high')
     with pytest.raises(IOError, match='Write was too slow and old samples were regenerated'):
-        ao1.write(np.random.uniform(size=n))
+        ao1.write(np.random.uniform(size=n).astype(np.float32))
 
 
 def test_circuit_read_too_slow(project, ai1):
@@ -125,83 +126,91 @@ def test_circuit_read_too_slow(project, ai1):
 
 
 def test_circuit_read_wrap(project, ai1, ai2):
+    # Each read returns at most one buffer worth of samples, so this is enough
+    # room for all reads below.
+    d1 = np.empty((ai1.channels, ai1.size * 16), dtype=ai1.dest_type)
+    d2 = np.empty((ai2.channels, ai2.size * 16), dtype=ai2.dest_type)
+    n1 = n2 = 0
     project.trigger('A', 'high')
-    d1 = []
-    d2 = []
     for i in range(15):
         time.sleep(0.1)
-        d1.append(ai1.read())
-        d2.append(ai2.read())
+        n1 += ai1.read_into(d1[:, n1:])
+        n2 += ai2.read_into(d2[:, n2:])
     project.trigger('A', 'low')
-    d1.append(ai1.read())
-    d2.append(ai2.read())
-    d1 = np.concatenate(d1, axis=1)
-    d2 = np.concatenate(d2, axis=1)
-    assert d1.shape[-1] == ((ai1.read_cycle * ai1.n_slots) + ai1.read_index)
-    assert d2.shape[-1] == ((ai2.read_cycle * ai2.n_slots) + ai2.read_index)
-    assert d1.shape == d2.shape
+    n1 += ai1.read_into(d1[:, n1:])
+    n2 += ai2.read_into(d2[:, n2:])
+    assert n1 == ((ai1.read_cycle * ai1.n_slots) + ai1.read_index)
+    assert n2 == ((ai2.read_cycle * ai2.n_slots) + ai2.read_index)
+    assert n1 == n2
     assert ai1.read_cycle != 0
 
 
+def test_poll_buffers(project, ai1, ai2):
+    project.trigger('A', 'high')
+    time.sleep(0.1)
+    project.trigger('A', 'low')
+    d1, d2 = project.poll_buffers([ai1, ai2])
+    assert d1.shape[-1] > 0
+    assert d1.shape == d2.shape
+    with pytest.raises(ValueError, match='only be polled once'):
+        project.poll_buffers([ai1, ai2, ai1])
+
+
 @pytest.mark.parametrize("dec_factor", [1, 2, 4, 8])
 def test_circuit_dec_read_wrap(project, circuit, dec_factor):
     # Verify that decimated buffer reads properly wrap around
     ai1 = circuit.get_buffer('ai_dec1', 'r', dec_factor=dec_factor)
     read_time = ai1.n_samples / ai1.fs
     print(read_time)
+    d1 = np.empty((ai1.channels, ai1.size * 16), dtype=ai1.dest_type)
+    n1 = 0
     project.trigger('A', 'high')
-    d1 = []
     for i in range(15):
         time.sleep(read_time * 0.1)
-        d1.append(ai1.read())
+        n1 += ai1.read_into(d1[:, n1:])
     project.trigger('A', 'low')
-    d1.append(ai1.read())
-    d1 = np.concatenate(d1, axis=1)
-    assert d1.shape[-1] == ((ai1.read_cycle * ai1.n_slots) + ai1.read_index)
+    n1 += ai1.read_into(d1[:, n1:])
+    assert n1 == ((ai1.read_cycle * ai1.n_slots) + ai1.read_index)
     assert ai1.read_cycle != 0
 
 
 def test_circuit_write_wrap(project, ao1, ao2, ai1, ai2):
-    d1 = np.random.uniform(size=ao1.available())
-    ao1.write(d1)
-    w1 = [d1]
-
-    d2 = np.random.uniform(size=ao2.available())
-    ao2.write(d2)
-    w2 = [d2]
-    r1 = []
-    r2 = []
+    rng = np.random.default_rng()
+
+    # Each write and read is at most one buffer in size, so this is enough
+    # room for the initial write, the 15 writes and reads in the loop and the
+    # final write and read.
+    w1 = np.empty(ao1.size * 17, dtype=np.float32)
+    w2 = np.empty(ao2.size * 17, dtype=np.float32)
+    r1 = np.empty((ai1.channels, ai1.size * 17), dtype=ai1.dest_type)
+    r2 = np.empty((ai2.channels, ai2.size * 17), dtype=ai2.dest_type)
+
+    def write(ao, w, offset):
+        data = w[offset:offset + ao.available()]
+        rng.random(dtype=np.float32, out=data)
+        ao.write(data)
+        return offset + data.shape[-1]
+
+    nw1 = write(ao1, w1, 0)
+    nw2 = write(ao2, w2, 0)
+    nr1 = nr2 = 0
 
     project.trigger('A', 'high')
     for i in range(15):
         time.sleep(0.1)
-        d1 = np.random.uniform(size=ao1.available())
-        ao1.write(d1)
-        w1.append(d1)
-        d2 = np.random.uniform(size=ao2.available())
-        ao2.write(d2)
-        w2.append(d2)
-
-        r1.append(ai1.read())
-        r2.append(ai2.read())
+        nw1 = write(ao1, w1, nw1)
+        nw2 = write(ao2, w2, nw2)
+        nr1 += ai1.read_into(r1[:, nr1:])
+        nr2 += ai2.read_into(r2[:, nr2:])
 
     project.trigger('A', 'low')
-    d1 = np.random.uniform(size=ao1.available())
-    ao1.write(d1)
-    w1.append(d1)
-    d2 = np.random.uniform(size=ao2.available())
-    ao2.write(d2)
-    w2.append(d2)
-    r1.append(ai1.read())
-    r2.append(ai2.read())
-
-    w1 = np.concatenate(w1, axis=-1)
-    w2 = np.concatenate(w2, axis=-1)
-    r1 = np.concatenate(r1, axis=-1)[0]
-    r2 = np.concatenate(r2, axis=-1)[0]
-
-    assert r1.shape == r2.shape
-    n = r1.shape[0]
-
-    np.testing.assert_array_almost_equal(w1[:n], r1)
-    np.testing.assert_array_almost_equal(w2[:n], r2)
+    nw1 = write(ao1, w1, nw1)
+    nw2 = write(ao2, w2, nw2)
+    nr1 += ai1.read_into(r1[:, nr1:])
+    nr2 += ai2.read_into(r2[:, nr2:])
+
+    assert nr1 == nr2
+    n = nr1
+
+    np.testing.assert_array_almost_equal(w1[:n], r1[0, :n])
+    np.testing.assert_array_almost_equal(w2[:n], r2[0, :n])
@@ -0,0 +1,128 @@
+import ctypes
+import gc
+import multiprocessing as mp
+import os
+
+import numpy as np
+import pytest
+
+from tdt.util import (best_sf, get_cof_path, resolution, shmem_as_ndarray,
+                      _SHMEM_VIEW_CACHE)
+
+
+COMPONENTS_DIR = os.path.join(os.path.dirname(__file__), '..', 'tdt',
+                              'components')
+
+
+def test_get_cof_path_components():
+    # Circuits shipped with TDTPy are found with or without the extension.
+    expected = os.path.join(COMPONENTS_DIR, 'test_read.rcx')
+    assert os.path.samefile(get_cof_path('test_read'), expected)
+    assert os.path.samefile(get_cof_path('test_read.rcx'), expected)
+
+
+@pytest.mark.skipif(os.name != 'nt', reason='Filenames are case-sensitive')
+def test_get_cof_path_components_case():
+    expected = os.path.join(COMPONENTS_DIR, 'test_read.rcx')
+    assert os.path.samefile(get_cof_path('Test_Read'), expected)
+    assert os.path.samefile(get_cof_path('TEST_READ.RCX'), expected)
+
+
+def test_get_cof_path_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(FileNotFoundError, match='Could not find circuit'):
+        get_cof_path('missing')
+
+    circuit = tmp_path / 'circuit.rcx'
+    circuit.touch()
+    assert get_cof_path('circuit') == str(circuit)
+
+    # A circuit that is removed after it was found must not resolve to the
+    # stale path.
+    circuit.unlink()
+    with pytest.raises(FileNotFoundError, match='Could not find circuit'):
+        get_cof_path('circuit')
+
+
+def test_shmem_as_ndarray():
+    raw_array = mp.RawArray(ctypes.c_float, 6)
+    view = shmem_as_ndarray(raw_array)
+    assert view.dtype == np.float32
+    assert view.shape == (6,)
+
+    # The view shares memory with the RawArray.
+    view[:] = np.arange(6)
+    assert list(raw_array) == [0, 1, 2, 3, 4, 5]
+    raw_array[0] = 10
+    assert view[0] == 10
+
+    # Live views are reused.
+    assert shmem_as_ndarray(raw_array) is view
+
+
+def test_shmem_as_ndarray_readonly():
+    raw_array = mp.RawArray(ctypes.c_short, 4)
+    view = shmem_as_ndarray(raw_array)
+    ro_view = shmem_as_ndarray(raw_array, readonly=True)
+    assert ro_view is not view
+    assert view.flags.writeable
+    assert not ro_view.flags.writeable
+    with pytest.raises(ValueError):
+        ro_view[0] = 1
+
+    # Both views see the same memory.
+    view[0] = 1
+    assert ro_view[0] == 1
+
+
+def test_shmem_as_ndarray_shape():
+    raw_array = mp.RawArray(ctypes.c_float, 6)
+    view = shmem_as_ndarray(raw_array, shape=(2, -1))
+    assert view.shape == (2, 3)
+    assert shmem_as_ndarray(raw_array, shape=(2, -1)) is view
+    assert shmem_as_ndarray(raw_array).shape == (6,)
+
+    view[1, 0] = 1
+    assert raw_array[3] == 1
+
+
+def test_shmem_as_ndarray_cache_release():
+    raw_array = mp.RawArray(ctypes.c_float, 6)
+    view = shmem_as_ndarray(raw_array)
+    key = id(raw_array), False, None
+    assert _SHMEM_VIEW_CACHE[key] is view
+
+    # The view keeps the RawArray alive, so the cache entry (and the id used
+    # in its key) stays valid until the view is released.
+    del raw_array
+    gc.collect()
+    assert key in _SHMEM_VIEW_CACHE
+    del view
+    gc.collect()
+    assert key not in _SHMEM_VIEW_CACHE
+
+
+def test_resolution():
+    assert resolution('int8', 127) == pytest.approx(1/127)
+    assert resolution(np.int16, 10) == pytest.approx(0.1)
+
+    # Float types use the decimal resolution of the type.
+    assert resolution('float32', 1) == pytest.approx(1e-6)
+    assert resolution('float32', 10) == pytest.approx(1e-7)
+
+    # Scaling factors that are 0-d arrays (e.g., read from a tag) work too.
+    assert resolution(np.int16, np.array(10.0)) == pytest.approx(0.1)
+
+    with pytest.raises(ValueError, match='Unsupported Numpy dtype'):
+        resolution('complex64', 1)
+
+
+def test_best_sf():
+    assert best_sf('int16', 2) == pytest.approx(32767/2)
+    assert best_sf('int16', (-2, 1)) == pytest.approx(32767/2)
+    assert best_sf('int16', [1, -2]) == pytest.approx(32767/2)
+    assert best_sf('int16', np.array(2.0)) == pytest.approx(32767/2)
+
+    # Nested sequences and multidimensional arrays are flattened.
+    assert best_sf('int16', ((1, -2), (0.5, 1))) == pytest.approx(32767/2)
+    assert best_sf('int16', np.array([[1, -2]])) == pytest.approx(32767/2)